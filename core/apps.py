@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    # Marcado na primeira vez em que se observa um usuário cadastrado
+    # (ver views._existe_usuario); não muda mais durante o processo
+    setup_concluido = False
+
+    def ready(self):
+        # Registra os receivers de invalidação de cache
+        from . import signals  # noqa: F401
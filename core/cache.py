@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from django.utils import timezone
+
+# Chaves e invalidação dos valores cacheados do app. Fica numa camada
+# própria (sem dependência de models/forms/views) para que views, forms e
+# core/signals.py importem daqui sem ciclos.
+
+
+# ========== CHAVES ==========
+
+# Setup concluído (já há usuário cadastrado); definitivo, sem expiração
+CACHE_KEY_EXISTE_USUARIO = 'core:existe_usuario'
+
+# Opções (pk, rótulo) dos <select> (core.forms)
+CACHE_KEY_OPCOES_TIPO_ATO = 'core:opcoes_tipo_ato'
+CACHE_KEY_OPCOES_RESPONSAVEL = 'core:opcoes_responsavel'
+CACHE_TIMEOUT_OPCOES = 60  # segundos
+
+# Estatísticas do dashboard
+CACHE_KEY_DASHBOARD_STATS = 'core:dashboard_stats'
+CACHE_TIMEOUT_DASHBOARD_STATS = 60  # segundos
+
+# Agenda do dia (por data)
+CACHE_KEY_AGENDA_DO_DIA = 'core:agenda:'
+
+# Instante da última escrita por escopo ('protocolo', 'cliente', 'user',
+# 'tipo_ato'). Alimenta a validação condicional das views, respondendo 304
+# sem consultar o banco, e invalida os totais cacheados da paginação.
+CACHE_KEY_ULTIMA_ALTERACAO = 'core:ultima_alteracao:'
+CACHE_KEY_TOTAL = 'core:total:'
+CACHE_TIMEOUT_TOTAL = 300  # segundos
+
+
+def chave_agenda_do_dia(dia=None):
+    """Chave de cache da agenda de `dia` (padrão: hoje, no fuso local)."""
+    return CACHE_KEY_AGENDA_DO_DIA + (dia or timezone.localdate()).isoformat()
+
+
+# ========== SETUP ==========
+
+def existe_usuario_cacheado():
+    """Indica se o cache já registrou que há usuário cadastrado."""
+    return bool(cache.get(CACHE_KEY_EXISTE_USUARIO))
+
+
+def marcar_existe_usuario():
+    """Registra, sem expiração, que já há usuário cadastrado (setup concluído)."""
+    cache.set(CACHE_KEY_EXISTE_USUARIO, True, None)
+
+
+# ========== CONTROLE DE ALTERAÇÕES ==========
+
+def marcar_alteracao(*escopos):
+    """Registra agora como o instante da última alteração dos escopos."""
+    agora = timezone.now()
+    cache.set_many({CACHE_KEY_ULTIMA_ALTERACAO + e: agora for e in escopos}, None)
+    cache.delete_many([CACHE_KEY_TOTAL + e for e in escopos])
+
+
+def total_cacheado(escopo, queryset):
+    """COUNT(*) do queryset (sem filtros) cacheado até a próxima alteração do escopo."""
+    return cache.get_or_set(CACHE_KEY_TOTAL + escopo, queryset.count, CACHE_TIMEOUT_TOTAL)
+
+
+def ultima_alteracao(*escopos):
+    """
+    Retorna o instante mais recente entre os escopos. Escopos ausentes do
+    cache (ex.: após reinício) passam a valer agora, invalidando cópias antigas.
+    """
+    chaves = [CACHE_KEY_ULTIMA_ALTERACAO + e for e in escopos]
+    valores = cache.get_many(chaves)
+    if len(valores) < len(chaves):
+        agora = timezone.now()
+        faltantes = {k: agora for k in chaves if k not in valores}
+        cache.set_many(faltantes, None)
+        valores.update(faltantes)
+    return max(valores.values())
+
+
+# ========== INVALIDAÇÃO ==========
+# Chamadas pelos sinais em core/signals.py e, diretamente, pelas escritas
+# em lote (queryset.update()/bulk_*), que não disparam post_save.
+
+def invalidar_caches_tipo_ato():
+    """Descarta o que é derivado dos Tipos de Ato: opções do form e agenda do dia (exibe o nome)."""
+    cache.delete_many([CACHE_KEY_OPCOES_TIPO_ATO, chave_agenda_do_dia()])
+    marcar_alteracao('tipo_ato')
+
+
+def invalidar_caches_usuario():
+    """Descarta as opções de Responsável e marca a alteração dos usuários."""
+    cache.delete(CACHE_KEY_OPCOES_RESPONSAVEL)
+    marcar_alteracao('user')
+
+
+def invalidar_caches_protocolo():
+    """Descarta as estatísticas e a agenda do dia quando protocolos mudam."""
+    cache.delete_many([CACHE_KEY_DASHBOARD_STATS, chave_agenda_do_dia()])
+    marcar_alteracao('protocolo')
+
+
+def invalidar_caches_cliente():
+    """Descarta as estatísticas (total de clientes) quando clientes mudam."""
+    cache.delete(CACHE_KEY_DASHBOARD_STATS)
+    marcar_alteracao('cliente')
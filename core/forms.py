@@ -1,20 +1,45 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from django import forms
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.forms.models import ModelChoiceIterator
+from .cache import (
+    CACHE_KEY_OPCOES_RESPONSAVEL,
+    CACHE_KEY_OPCOES_TIPO_ATO,
+    CACHE_TIMEOUT_OPCOES,
+    invalidar_caches_usuario,
+)
 from .models import Tabelionato, TipoAto, Cliente, Protocolo
 
 User = get_user_model()
 
+# (is_staff, is_superuser) por role; demais roles acessam o admin sem superusuário
+_ROLE_FLAGS = {
+    User.Role.MASTER: (True, True),
+}
+_ROLE_FLAGS_PADRAO = (True, False)
+
+# Hashes simultâneos em save_many: cada Argon2 aloca memory_cost (46 MiB)
+_MAX_HASHES_PARALELOS = 2
+
+
+def _form_control(**extra):
+    """Attrs padrão dos inputs Bootstrap ('form-control') com extras."""
+    return {'class': 'form-control', **extra}
+
 
 class SetupMasterForm(forms.ModelForm):
     """Formulário para criação do usuário Master no setup inicial."""
     
     password = forms.CharField(
-        widget=forms.PasswordInput(attrs={'class': 'form-control', 'placeholder': 'Senha'}),
+        widget=forms.PasswordInput(attrs=_form_control(placeholder='Senha')),
         label="Senha"
     )
     password_confirm = forms.CharField(
-        widget=forms.PasswordInput(attrs={'class': 'form-control', 'placeholder': 'Confirme a Senha'}),
+        widget=forms.PasswordInput(attrs=_form_control(placeholder='Confirme a Senha')),
         label="Confirmação de Senha"
     )
 
@@ -22,10 +47,10 @@ class SetupMasterForm(forms.ModelForm):
         model = User
         fields = ['username', 'email', 'first_name', 'last_name']
         widgets = {
-            'username': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Usuário (Login)'}),
-            'email': forms.EmailInput(attrs={'class': 'form-control', 'placeholder': 'E-mail'}),
-            'first_name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Nome'}),
-            'last_name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Sobrenome'}),
+            'username': forms.TextInput(attrs=_form_control(placeholder='Usuário (Login)')),
+            'email': forms.EmailInput(attrs=_form_control(placeholder='E-mail')),
+            'first_name': forms.TextInput(attrs=_form_control(placeholder='Nome')),
+            'last_name': forms.TextInput(attrs=_form_control(placeholder='Sobrenome')),
         }
 
     def clean(self):
@@ -36,9 +61,13 @@ class SetupMasterForm(forms.ModelForm):
         if password and password_confirm and password != password_confirm:
             self.add_error('password_confirm', "As senhas não conferem.")
 
+        # A confirmação já cumpriu seu papel: não mantém o texto puro no form
+        cleaned_data.pop('password_confirm', None)
+        return cleaned_data
+
     def save(self, commit=True):
         user = super().save(commit=False)
-        user.set_password(self.cleaned_data["password"])
+        user.set_password(self.cleaned_data.pop("password"))
         # Definições forçadas de segurança para o MASTER
         user.role = User.Role.MASTER
         user.is_superuser = True
@@ -56,21 +85,17 @@ class UserForm(forms.ModelForm):
     """
     
     password = forms.CharField(
-        widget=forms.PasswordInput(attrs={
-            'class': 'form-control',
-            'placeholder': 'Digite a senha',
-            'autocomplete': 'new-password'
-        }),
+        widget=forms.PasswordInput(attrs=_form_control(
+            placeholder='Digite a senha', autocomplete='new-password'
+        )),
         label="Senha",
         required=False,
         help_text="Deixe em branco para manter a senha atual (apenas na edição)."
     )
     password_confirm = forms.CharField(
-        widget=forms.PasswordInput(attrs={
-            'class': 'form-control',
-            'placeholder': 'Confirme a senha',
-            'autocomplete': 'new-password'
-        }),
+        widget=forms.PasswordInput(attrs=_form_control(
+            placeholder='Confirme a senha', autocomplete='new-password'
+        )),
         label="Confirmar Senha",
         required=False
     )
@@ -87,22 +112,10 @@ class UserForm(forms.ModelForm):
             'is_active': 'Usuário Ativo',
         }
         widgets = {
-            'first_name': forms.TextInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'Nome'
-            }),
-            'last_name': forms.TextInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'Sobrenome'
-            }),
-            'username': forms.TextInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'nome.sobrenome'
-            }),
-            'email': forms.EmailInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'email@exemplo.com'
-            }),
+            'first_name': forms.TextInput(attrs=_form_control(placeholder='Nome')),
+            'last_name': forms.TextInput(attrs=_form_control(placeholder='Sobrenome')),
+            'username': forms.TextInput(attrs=_form_control(placeholder='nome.sobrenome')),
+            'email': forms.EmailInput(attrs=_form_control(placeholder='email@exemplo.com')),
             'role': forms.Select(attrs={
                 'class': 'form-select'
             }),
@@ -118,45 +131,102 @@ class UserForm(forms.ModelForm):
             self.fields['password'].required = True
             self.fields['password_confirm'].required = True
             self.fields['password'].help_text = "Obrigatório para novos usuários."
+            # A obrigatoriedade é validada uma única vez, pelo próprio campo
+            self.fields['password'].error_messages['required'] = "Senha é obrigatória para novos usuários."
 
     def clean(self):
         cleaned_data = super().clean()
         password = cleaned_data.get("password")
-        password_confirm = cleaned_data.get("password_confirm")
+        # A confirmação só serve para esta checagem: não mantém o texto puro no form
+        password_confirm = cleaned_data.pop("password_confirm", None)
 
         # Validação de senhas apenas se alguma foi preenchida
+        # (senha ausente na criação já foi barrada pelo required do campo)
         if password or password_confirm:
             if password != password_confirm:
                 self.add_error('password_confirm', "As senhas não conferem.")
             elif len(password) < 6:
                 self.add_error('password', "A senha deve ter pelo menos 6 caracteres.")
 
-        # Se é criação e senha não foi fornecida
-        if not self.instance.pk and not password:
-            self.add_error('password', "Senha é obrigatória para novos usuários.")
-
         return cleaned_data
 
     def save(self, commit=True):
+        # Retira a senha em texto puro do form; só é usada para gerar o hash
+        password = self.cleaned_data.pop("password", None)
         user = super().save(commit=False)
-        password = self.cleaned_data.get("password")
         
         # Só atualiza a senha se foi fornecida
         if password:
             user.set_password(password)
         
         # Define is_staff e is_superuser baseado na role
-        if user.role == User.Role.MASTER:
-            user.is_staff = True
-            user.is_superuser = True
-        else:
-            user.is_staff = True  # Permite acesso ao admin
-            user.is_superuser = False
+        user.is_staff, user.is_superuser = _ROLE_FLAGS.get(user.role, _ROLE_FLAGS_PADRAO)
         
         if commit:
-            user.save()
+            if user._state.adding:
+                user.save()
+            else:
+                # Edição: UPDATE apenas das colunas alteradas + derivadas
+                # (numa troca só de senha: password, is_staff, is_superuser)
+                campos = [f for f in self.changed_data if f in self._meta.fields]
+                if password:
+                    campos.append('password')
+                campos += ['is_staff', 'is_superuser']
+                user.save(update_fields=campos)
         return user
 
+    @classmethod
+    def save_many(cls, rows, batch_size=500):
+        """
+        Cria usuários em lote a partir de dicts já validados (ex.: cleaned_data
+        de vários UserForm): hash das senhas em paralelo (o argon2-cffi libera
+        o GIL, limitado a _MAX_HASHES_PARALELOS pela memória de cada hash) e
+        INSERT via bulk_create, em lotes de `batch_size`.
+        Levanta ValidationError, sem criar nenhum usuário, se algum username
+        se repete no lote ou já existe no banco.
+        """
+        rows = list(rows)
+        usernames = [row['username'] for row in rows]
+        repetidos = [u for u, n in Counter(usernames).items() if n > 1]
+        if repetidos:
+            raise forms.ValidationError(
+                "Username(s) repetido(s) no lote: %s." % ', '.join(sorted(repetidos))
+            )
+        existentes = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        if existentes:
+            raise forms.ValidationError(
+                "Usuário(s) já cadastrado(s): %s." % ', '.join(sorted(existentes))
+            )
+
+        with ThreadPoolExecutor(max_workers=_MAX_HASHES_PARALELOS) as executor:
+            hashes = list(executor.map(
+                make_password,
+                (row['password'] for row in rows),
+            ))
+
+        usuarios = []
+        for row, password_hash in zip(rows, hashes):
+            role = row.get('role', User.Role.ESCREVENTE)
+            is_staff, is_superuser = _ROLE_FLAGS.get(role, _ROLE_FLAGS_PADRAO)
+            usuarios.append(User(
+                username=row['username'],
+                email=row.get('email', ''),
+                first_name=row.get('first_name', ''),
+                last_name=row.get('last_name', ''),
+                role=role,
+                is_active=row.get('is_active', True),
+                is_staff=is_staff,
+                is_superuser=is_superuser,
+                password=password_hash,
+            ))
+
+        # Sem ignore_conflicts: um username criado em paralelo desde a checagem
+        # gera IntegrityError e o bulk_create (atômico) não grava nenhum lote
+        criados = User.objects.bulk_create(usuarios, batch_size=batch_size)
+        # bulk_create não dispara post_save: invalida as opções de responsável
+        invalidar_caches_usuario()
+        return criados
+
 
 # ========== CONFIGURAÇÕES ==========
 
@@ -247,15 +317,23 @@ class TipoAtoForm(forms.ModelForm):
     def save(self, commit=True):
         instance = super().save(commit=False)
         
-        # Converte dias para timedelta
+        # Converte dias para timedelta (só atribui se mudou)
         dias = self.cleaned_data.get('tempo_alerta_dias')
-        if dias is not None and dias > 0:
-            instance.tempo_alerta = timedelta(days=dias)
-        else:
-            instance.tempo_alerta = None
+        tempo_alerta = timedelta(days=dias) if dias is not None and dias > 0 else None
+        tempo_alerta_alterado = tempo_alerta != instance.tempo_alerta
+        if tempo_alerta_alterado:
+            instance.tempo_alerta = tempo_alerta
         
         if commit:
-            instance.save()
+            if instance._state.adding:
+                instance.save()
+            else:
+                # Na edição, grava apenas as colunas alteradas (ou nada, se nenhuma)
+                campos = [f for f in self.changed_data if f in self._meta.fields]
+                if tempo_alerta_alterado:
+                    campos.append('tempo_alerta')
+                if campos:
+                    instance.save(update_fields=campos)
         return instance
 
 
@@ -267,12 +345,26 @@ class ClienteForm(forms.ModelForm):
     O campo CPF/CNPJ é mostrado dinamicamente via JavaScript no template.
     """
     
+    # Resolvidos uma vez na definição da classe (usados a cada clean)
+    _TP_FISICA = Cliente.TipoPessoa.FISICA
+    _TP_JURIDICA = Cliente.TipoPessoa.JURIDICA
+    
+    # Choices fixados na classe (evita reconstruí-los a partir do model field)
+    tipo_pessoa = forms.ChoiceField(
+        choices=Cliente.TipoPessoa.choices,
+        initial=Cliente.TipoPessoa.FISICA,
+        label='Tipo de Pessoa',
+        widget=forms.Select(attrs={
+            'class': 'form-select',
+            'id': 'id_tipo_pessoa'
+        }),
+    )
+    
     class Meta:
         model = Cliente
         fields = ['nome', 'tipo_pessoa', 'cpf', 'cnpj', 'telefone', 'email', 'endereco']
         labels = {
             'nome': 'Nome Completo / Razão Social',
-            'tipo_pessoa': 'Tipo de Pessoa',
             'cpf': 'CPF',
             'cnpj': 'CNPJ',
             'telefone': 'Telefone',
@@ -284,10 +376,6 @@ class ClienteForm(forms.ModelForm):
                 'class': 'form-control',
                 'placeholder': 'Nome completo ou razão social'
             }),
-            'tipo_pessoa': forms.Select(attrs={
-                'class': 'form-select',
-                'id': 'id_tipo_pessoa'
-            }),
             'cpf': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': '000.000.000-00',
@@ -319,12 +407,11 @@ class ClienteForm(forms.ModelForm):
         self.fields['cpf'].required = False
         self.fields['cnpj'].required = False
     
-    def _limpar_documento(self, valor):
+    @staticmethod
+    def _limpar_documento(valor):
         """Remove pontuação de CPF/CNPJ, mantendo apenas números."""
-        if valor:
-            import re
-            return re.sub(r'\D', '', valor)
-        return valor
+        # str.isdecimal equivale ao \d da regex; mais rápido em strings curtas
+        return ''.join(filter(str.isdecimal, valor)) if valor else valor
     
     def clean_cpf(self):
         """Limpa pontuação do CPF antes de salvar."""
@@ -343,14 +430,14 @@ class ClienteForm(forms.ModelForm):
         cnpj = cleaned_data.get('cnpj')
         
         # Limpa o campo que não deve ser preenchido baseado no tipo
-        if tipo_pessoa == Cliente.TipoPessoa.FISICA:
+        if tipo_pessoa == self._TP_FISICA:
             # Pessoa Física: precisa de CPF, não pode ter CNPJ
             if not cpf:
                 self.add_error('cpf', 'CPF é obrigatório para Pessoa Física.')
             # Limpa CNPJ se preenchido (pode ter sido preenchido antes de trocar o tipo)
             cleaned_data['cnpj'] = None
             
-        elif tipo_pessoa == Cliente.TipoPessoa.JURIDICA:
+        elif tipo_pessoa == self._TP_JURIDICA:
             # Pessoa Jurídica: precisa de CNPJ, não pode ter CPF
             if not cnpj:
                 self.add_error('cnpj', 'CNPJ é obrigatório para Pessoa Jurídica.')
@@ -358,6 +445,92 @@ class ClienteForm(forms.ModelForm):
             cleaned_data['cpf'] = None
         
         return cleaned_data
+    
+    def save(self, commit=True):
+        cliente = super().save(commit=False)
+        if commit:
+            # O form já executou o full_clean() do model em _post_clean()
+            if cliente._state.adding:
+                cliente.save(skip_clean=True)
+            else:
+                # Edição: UPDATE apenas das colunas alteradas + CPF/CNPJ,
+                # que o clean() pode anular ao trocar o tipo de pessoa
+                campos = [f for f in self.changed_data if f in self._meta.fields]
+                if campos:
+                    cliente.save(skip_clean=True, update_fields=campos + ['cpf', 'cnpj'])
+            self._save_m2m()
+        return cliente
+
+
+def _cache_do_request(request, atributo, fabrica):
+    """
+    Memoriza o resultado de `fabrica()` como atributo do request.
+    Sem request, apenas executa a fábrica (sem cache).
+    """
+    if request is None:
+        return fabrica()
+    if not hasattr(request, atributo):
+        setattr(request, atributo, fabrica())
+    return getattr(request, atributo)
+
+
+# ========== OPÇÕES CACHEADAS DOS <select> ==========
+# Tabelas de referência pequenas e pouco alteradas: as opções (pk, rótulo)
+# ficam no cache (chaves em core/cache.py) e são invalidadas pelos sinais
+# em core/signals.py.
+
+
+def opcoes_tipo_ato():
+    """Retorna as opções (pk, nome) dos Tipos de Ato ativos."""
+    return cache.get_or_set(
+        CACHE_KEY_OPCOES_TIPO_ATO,
+        lambda: list(TipoAto.objects.filter(ativo=True).values_list('pk', 'nome')),
+        CACHE_TIMEOUT_OPCOES,
+    )
+
+
+def opcoes_responsavel():
+    """Retorna as opções (pk, nome completo ou username) dos usuários ativos."""
+    def montar():
+        usuarios = User.objects.filter(is_active=True).order_by(
+            'first_name', 'last_name', 'username'
+        ).values_list('pk', 'first_name', 'last_name', 'username')
+        # Mesmo rótulo de ResponsavelChoiceField.label_from_instance
+        return [
+            (pk, f'{first_name} {last_name}'.strip() or username)
+            for pk, first_name, last_name, username in usuarios
+        ]
+    return cache.get_or_set(CACHE_KEY_OPCOES_RESPONSAVEL, montar, CACHE_TIMEOUT_OPCOES)
+
+
+class ListaModelChoiceIterator(ModelChoiceIterator):
+    """
+    Gera as opções de um ModelChoiceField a partir de uma lista (pk, rótulo)
+    já carregada, evitando consulta ao banco a cada renderização do <select>.
+    """
+
+    def __init__(self, field, opcoes):
+        super().__init__(field)
+        self.opcoes = opcoes
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        yield from self.opcoes
+
+    def __len__(self):
+        return len(self.opcoes) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.opcoes)
+
+
+class ResponsavelChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField de usuários que exibe apenas o nome, sem o role."""
+
+    def label_from_instance(self, obj):
+        """Retorna apenas o nome completo ou username, sem o role."""
+        return obj.get_full_name() or obj.username
 
 
 class ProtocoloCertidaoForm(forms.ModelForm):
@@ -369,6 +542,28 @@ class ProtocoloCertidaoForm(forms.ModelForm):
     não fazem parte deste form.
     """
 
+    # Campos declarados na classe: o ModelForm os copia para cada instância
+    # em vez de gerar o campo padrão do ForeignKey e reconfigurá-lo no __init__
+    tipo_ato = forms.ModelChoiceField(
+        queryset=TipoAto.objects.filter(ativo=True),  # Apenas tipos de ato ativos
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        }),
+        label='Tipo de Certidão',
+    )
+    # Exibe apenas o nome dos usuários ativos
+    responsavel = ResponsavelChoiceField(
+        queryset=User.objects.filter(is_active=True).only(
+            'first_name', 'last_name', 'username'
+        ).order_by('first_name', 'last_name', 'username'),
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        }),
+        label='Responsável pelo Protocolo',
+        required=True,
+        empty_label='Selecione o responsável...'
+    )
+
     class Meta:
         model = Protocolo
         fields = [
@@ -379,18 +574,15 @@ class ProtocoloCertidaoForm(forms.ModelForm):
             'deposito_previo',
             'observacoes',
         ]
+        # data_agendamento, horario_agendamento e observacoes já são opcionais
+        # (blank=True no model)
         labels = {
-            'tipo_ato': 'Tipo de Certidão',
             'data_agendamento': 'Data de Entrega',
             'horario_agendamento': 'Horário',
-            'responsavel': 'Responsável pelo Protocolo',
             'deposito_previo': 'Depósito Prévio (R$)',
             'observacoes': 'Observações',
         }
         widgets = {
-            'tipo_ato': forms.Select(attrs={
-                'class': 'form-select'
-            }),
             'data_agendamento': forms.DateInput(attrs={
                 'class': 'form-control',
                 'type': 'date'
@@ -399,9 +591,6 @@ class ProtocoloCertidaoForm(forms.ModelForm):
                 'class': 'form-control',
                 'type': 'time'
             }),
-            'responsavel': forms.Select(attrs={
-                'class': 'form-select'
-            }),
             'deposito_previo': forms.NumberInput(attrs={
                 'class': 'form-control',
                 'step': '0.01',
@@ -418,29 +607,21 @@ class ProtocoloCertidaoForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         # Extrai o user do kwargs se fornecido (para definir valor inicial e permissões)
         self.user = kwargs.pop('user', None)
+        # Request opcional: permite reaproveitar as opções dos <select> entre
+        # os forms construídos no mesmo request (ex.: POST + form recriado)
+        request = kwargs.pop('request', None)
         instance = kwargs.get('instance', None)
         super().__init__(*args, **kwargs)
 
-        # Filtra apenas tipos de ato ativos
-        self.fields['tipo_ato'].queryset = TipoAto.objects.filter(ativo=True)
-
-        # Configura o campo responsavel com queryset de usuários ativos
-        # Usa label_from_instance para exibir apenas o nome, sem o role
-        class ResponsavelChoiceField(forms.ModelChoiceField):
-            def label_from_instance(self, obj):
-                """Retorna apenas o nome completo ou username, sem o role."""
-                if obj.get_full_name():
-                    return obj.get_full_name()
-                return obj.username
-
-        self.fields['responsavel'] = ResponsavelChoiceField(
-            queryset=User.objects.filter(is_active=True).order_by('first_name', 'last_name', 'username'),
-            widget=forms.Select(attrs={
-                'class': 'form-select'
-            }),
-            label='Responsável pelo Protocolo',
-            required=True,
-            empty_label='Selecione o responsável...'
+        tipo_ato_field = self.fields['tipo_ato']
+        responsavel_field = self.fields['responsavel']
+
+        # Opções vêm do cache; o queryset continua validando o valor enviado
+        tipo_ato_field.choices = ListaModelChoiceIterator(
+            tipo_ato_field, _cache_do_request(request, '_cached_tipo_ato', opcoes_tipo_ato)
+        )
+        responsavel_field.choices = ListaModelChoiceIterator(
+            responsavel_field, _cache_do_request(request, '_cached_responsaveis', opcoes_responsavel)
         )
 
         # Define valor inicial como o usuário atual na criação
@@ -473,9 +654,4 @@ class ProtocoloCertidaoForm(forms.ModelForm):
                     field.widget.attrs['class'] = f'{current_class} bg-light'
 
                     if field_name == 'observacoes':
-                        field.widget.attrs['placeholder'] = 'Sem permissão para editar observações'
-
-        # Campos opcionais
-        self.fields['data_agendamento'].required = False
-        self.fields['horario_agendamento'].required = False
-        self.fields['observacoes'].required = False
\ No newline at end of file
+                        field.widget.attrs['placeholder'] = 'Sem permissão para editar observações'
\ No newline at end of file
@@ -0,0 +1,30 @@
+from django.contrib.auth.hashers import Argon2PasswordHasher, must_update_salt
+
+
+class Argon2OWASPPasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id com o perfil mínimo recomendado pela OWASP
+    (m=46 MiB, t=1, p=1), em vez do padrão do Django (m=100 MiB, t=2, p=8).
+    Requer argon2-cffi (django[argon2] em requirements.txt).
+
+    Mantém o algoritmo 'argon2': hashes já existentes continuam válidos.
+    Só são recalculados no login os que estiverem abaixo deste perfil;
+    os gerados com o padrão do Django (mais forte) são mantidos.
+    """
+    time_cost = 1
+    memory_cost = 47104  # KiB (46 MiB)
+    parallelism = 1
+
+    def must_update(self, encoded):
+        algorithm, rest = encoded.split('$', 1)
+        assert algorithm == self.algorithm
+        argon2 = self._load_library()
+        atuais = argon2.extract_parameters('$' + rest)
+        return (
+            atuais.type != argon2.low_level.Type.ID
+            or atuais.version != argon2.low_level.ARGON2_VERSION
+            or atuais.time_cost < self.time_cost
+            or atuais.memory_cost < self.memory_cost
+            or atuais.hash_len < argon2.DEFAULT_HASH_LENGTH
+            or must_update_salt(self.decode(encoded)['salt'], self.salt_entropy)
+        )
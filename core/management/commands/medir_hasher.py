@@ -0,0 +1,41 @@
+import time
+
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Mede o tempo de hash/verificação de senha do hasher padrão
+    (PASSWORD_HASHERS[0]) nesta máquina, para calibrar seus parâmetros
+    em core/hashers.py conforme a latência desejada no login.
+    """
+    help = 'Mede a latência do hasher de senhas padrão (encode + verify).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-n', '--repeticoes', type=int, default=10,
+            help='Número de medições (padrão: 10).'
+        )
+
+    def handle(self, *args, **options):
+        hasher = get_hasher('default')
+        repeticoes = max(options['repeticoes'], 1)
+        senha = 'senha-de-teste-calibracao'
+
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            encoded = hasher.encode(senha, hasher.salt())
+        tempo_encode = (time.perf_counter() - inicio) / repeticoes
+
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            hasher.verify(senha, encoded)
+        tempo_verify = (time.perf_counter() - inicio) / repeticoes
+
+        self.stdout.write(f'Hasher: {hasher.__class__.__module__}.{hasher.__class__.__name__}')
+        self.stdout.write(f'Parâmetros: {hasher.safe_summary(encoded)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'encode: {tempo_encode * 1000:.1f} ms | verify: {tempo_verify * 1000:.1f} ms '
+            f'(média de {repeticoes})'
+        ))
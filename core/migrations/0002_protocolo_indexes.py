@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-14 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='protocolo',
+            index=models.Index(fields=['status'], name='prot_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='protocolo',
+            index=models.Index(fields=['data_agendamento', 'status'], name='prot_agend_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='protocolo',
+            index=models.Index(condition=models.Q(('status', 'EM_ANDAMENTO')), fields=['data_agendamento', 'horario_agendamento'], name='prot_em_andamento_agend_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-14 12:30
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_protocolo_indexes'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('nome'), name='gin_trgm_ops'), name='cliente_nome_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['tipo_pessoa'], name='cliente_tipo_pessoa_idx'),
+        ),
+    ]
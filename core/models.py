@@ -1,9 +1,11 @@
 import uuid
 from django.db import models
-from django.db.models import Max
+from django.db.models import Max, Q
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
 from django.utils import timezone
 
 # 1. USUÁRIOS PERSONALIZADOS
@@ -23,6 +25,20 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Trigram sobre UPPER(...) dos campos da busca de user_list (icontains)
+            GinIndex(
+                OpClass(Upper('first_name'), name='gin_trgm_ops'),
+                OpClass(Upper('last_name'), name='gin_trgm_ops'),
+                OpClass(Upper('username'), name='gin_trgm_ops'),
+                OpClass(Upper('email'), name='gin_trgm_ops'),
+                name='user_busca_trgm_idx',
+            ),
+            # Ordem de user_list (-date_joined, -pk), inclusive na navegação sequencial
+            models.Index(fields=['date_joined', 'id'], name='user_date_joined_id_idx'),
+        ]
+
 
 # 2. TABELIONATO (SINGLETON)
 class Tabelionato(models.Model):
@@ -91,16 +107,46 @@ class Cliente(models.Model):
             if self.cpf:
                 raise ValidationError("Pessoa Jurídica não deve ter CPF preenchido.")
 
-    def save(self, *args, **kwargs):
-        self.full_clean() # Garante que o clean() seja chamado antes de salvar
+    def save(self, *args, skip_clean=False, **kwargs):
+        # Garante que o clean() seja chamado antes de salvar.
+        # skip_clean=True apenas quando a validação já foi feita (ex.: ClienteForm),
+        # evitando repetir validadores e as consultas de unicidade de CPF/CNPJ.
+        if not skip_clean:
+            self.full_clean()
         super().save(*args, **kwargs)
 
     def __str__(self):
         doc = self.cpf if self.tipo_pessoa == self.TipoPessoa.FISICA else self.cnpj
         return f"{self.nome} ({doc})"
 
+    class Meta:
+        indexes = [
+            # Trigram sobre UPPER(nome): atende o icontains/istartswith do Django
+            # no PostgreSQL (UPPER(nome) LIKE UPPER(...)) sem seq scan
+            GinIndex(
+                OpClass(Upper('nome'), name='gin_trgm_ops'),
+                name='cliente_nome_trgm_idx',
+            ),
+            # Demais campos da busca de cliente_list (icontains)
+            GinIndex(
+                OpClass(Upper('cpf'), name='gin_trgm_ops'),
+                OpClass(Upper('cnpj'), name='gin_trgm_ops'),
+                OpClass(Upper('email'), name='gin_trgm_ops'),
+                name='cliente_busca_trgm_idx',
+            ),
+            models.Index(fields=['tipo_pessoa'], name='cliente_tipo_pessoa_idx'),
+            # Ordem de cliente_list (nome, pk), inclusive na navegação sequencial
+            models.Index(fields=['nome', 'id'], name='cliente_nome_id_idx'),
+        ]
+
 
 # 5. PROTOCOLO (CORE)
+class ProtocoloQuerySet(models.QuerySet):
+    def with_refs(self):
+        """Carrega via JOIN os FKs exibidos nas listagens (evita N+1)."""
+        return self.select_related('criado_por', 'responsavel', 'tipo_ato')
+
+
 class Protocolo(models.Model):
     class TipoProtocolo(models.TextChoices):
         ATO_NOTARIAL = 'ATO_NOTARIAL', 'Ato Notarial'
@@ -146,6 +192,8 @@ class Protocolo(models.Model):
     clientes = models.ManyToManyField(Cliente, related_name='protocolos_como_cliente', verbose_name="Clientes Envolvidos")
     advogados = models.ManyToManyField(Cliente, related_name='protocolos_como_advogado', blank=True, verbose_name="Advogados")
 
+    objects = ProtocoloQuerySet.as_manager()
+
     def save(self, *args, **kwargs):
         """
         Gera automaticamente o numero_protocolo se estiver vazio.
@@ -201,6 +249,19 @@ class Protocolo(models.Model):
     def __str__(self):
         return f"Prot: {self.numero_protocolo} - {self.get_status_display()}"
 
+    class Meta:
+        indexes = [
+            # Contagens por status (dashboard)
+            models.Index(fields=['status'], name='prot_status_idx'),
+            models.Index(fields=['data_agendamento', 'status'], name='prot_agend_status_idx'),
+            # Agendamentos do dia em andamento, já na ordem de horário (home)
+            models.Index(
+                fields=['data_agendamento', 'horario_agendamento'],
+                condition=Q(status='EM_ANDAMENTO'),
+                name='prot_em_andamento_agend_idx',
+            ),
+        ]
+
 
 # 6. DADOS ESCRITURA (EXTENSÃO)
 class DadosEscritura(models.Model):
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import (
+    invalidar_caches_cliente,
+    invalidar_caches_protocolo,
+    invalidar_caches_tipo_ato,
+    invalidar_caches_usuario,
+)
+from .models import Cliente, Protocolo, TipoAto
+
+User = get_user_model()
+
+
+# ========== INVALIDAÇÃO DAS OPÇÕES CACHEADAS ==========
+
+@receiver([post_save, post_delete], sender=TipoAto)
+def invalidar_opcoes_tipo_ato(sender, **kwargs):
+    """Descarta as opções de Tipo de Ato ao criar/editar/excluir um registro."""
+    invalidar_caches_tipo_ato()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidar_opcoes_responsavel(sender, **kwargs):
+    """Descarta as opções de Responsável ao criar/editar/excluir um usuário."""
+    invalidar_caches_usuario()
+
+
+# ========== INVALIDAÇÃO DAS ESTATÍSTICAS DO DASHBOARD ==========
+
+@receiver([post_save, post_delete], sender=Protocolo)
+def invalidar_estatisticas_protocolo(sender, **kwargs):
+    """Descarta as estatísticas e a agenda do dia quando protocolos mudam."""
+    invalidar_caches_protocolo()
+
+
+@receiver([post_save, post_delete], sender=Cliente)
+def invalidar_estatisticas_cliente(sender, **kwargs):
+    """Descarta as estatísticas quando clientes mudam."""
+    invalidar_caches_cliente()
@@ -11,6 +11,18 @@ from django import template
 register = template.Library()
 
 
+def _somente_digitos(value):
+    """
+    Remove qualquer caractere não numérico.
+    Atalho: os documentos são gravados já sem pontuação, então na grande
+    maioria das chamadas a string já é só de dígitos e é devolvida como está.
+    """
+    texto = str(value)
+    if texto.isdigit():
+        return texto
+    return ''.join(filter(str.isdigit, texto))
+
+
 @register.filter(name='format_cpf')
 def format_cpf(value):
     """
@@ -22,7 +34,7 @@ def format_cpf(value):
         return ''
     
     # Remove qualquer caractere não numérico
-    cpf = ''.join(filter(str.isdigit, str(value)))
+    cpf = _somente_digitos(value)
     
     # Verifica se tem 11 dígitos
     if len(cpf) != 11:
@@ -43,7 +55,7 @@ def format_cnpj(value):
         return ''
     
     # Remove qualquer caractere não numérico
-    cnpj = ''.join(filter(str.isdigit, str(value)))
+    cnpj = _somente_digitos(value)
     
     # Verifica se tem 14 dígitos
     if len(cnpj) != 14:
@@ -64,7 +76,7 @@ def format_telefone(value):
         return ''
     
     # Remove qualquer caractere não numérico
-    tel = ''.join(filter(str.isdigit, str(value)))
+    tel = _somente_digitos(value)
     
     if len(tel) == 10:
         # Telefone fixo: (00) 0000-0000
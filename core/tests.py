@@ -1,3 +1,262 @@
-from django.test import TestCase
+import csv
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from . import forms
+from .forms import UserForm
+from .models import Cliente
+from .views import _processar_pessoas_do_post
+
+User = get_user_model()
+
+# Os testes não dependem do Redis: cada processo de teste usa memória local
+CACHE_LOCAL = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class RespostaCondicionalTests(TestCase):
+    """ETag / 304 das listagens e do dashboard."""
+
+    def setUp(self):
+        cache.clear()
+        self.master = User.objects.create_user('master', role=User.Role.MASTER)
+        self.client.force_login(self.master)
+
+    def test_envia_etag_e_exige_revalidacao(self):
+        response = self.client.get(reverse('cliente_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_sem_escrita_responde_304(self):
+        for nome in ('home', 'user_list', 'cliente_list'):
+            with self.subTest(nome=nome):
+                url = reverse(nome)
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_escrita_entre_gets_muda_a_resposta(self):
+        url = reverse('cliente_list')
+        etag = self.client.get(url)['ETag']
+
+        Cliente.objects.create(nome='CLIENTE NOVO', cpf='12345678909')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'CLIENTE NOVO')
+
+    def test_etag_depende_da_sessao(self):
+        outro = User.objects.create_user('outro', role=User.Role.MASTER)
+        url = reverse('user_list')
+        etag = self.client.get(url)['ETag']
+
+        self.client.force_login(outro)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class NavegacaoSequencialTests(TestCase):
+    """A navegação ?after=<pk> segue a mesma ordem da paginação numerada."""
+
+    def setUp(self):
+        cache.clear()
+        self.master = User.objects.create_user('master', role=User.Role.MASTER)
+        self.client.force_login(self.master)
+        # Nomes repetidos e inseridos fora de ordem: o pk não coincide com a ordem
+        nomes = [f'CLIENTE {i % 7:02d}' for i in range(30, 0, -1)]
+        for i, nome in enumerate(nomes):
+            Cliente.objects.create(nome=nome, cpf=f'{i:011d}')
+        self.ordem = list(Cliente.objects.order_by('nome', 'pk').values_list('pk', flat=True))
+
+    def test_sequencial_continua_a_pagina_numerada(self):
+        url = reverse('cliente_list')
+        primeira = self.client.get(url)
+        pks = [c.pk for c in primeira.context['clientes']]
+        self.assertEqual(pks, self.ordem[:20])
+        self.assertEqual(primeira.context['proximo_after'], self.ordem[19])
+
+        seguinte = self.client.get(url, {'after': primeira.context['proximo_after']})
+        self.assertTrue(seguinte.context['keyset'])
+        self.assertEqual([c.pk for c in seguinte.context['clientes']], self.ordem[20:])
+        self.assertIsNone(seguinte.context['proximo_after'])
+
+    def test_cursor_inexistente_volta_para_a_numerada(self):
+        response = self.client.get(reverse('cliente_list'), {'after': max(self.ordem) + 1})
+        self.assertFalse(response.context['keyset'])
+        self.assertEqual([c.pk for c in response.context['clientes']], self.ordem[:20])
+
+
+@override_settings(
+    CACHES=CACHE_LOCAL,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class SaveManyTests(TestCase):
+    """Criação de usuários em lote (UserForm.save_many)."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _rows(self, *usernames):
+        return [{'username': u, 'password': f'senha-{u}'} for u in usernames]
+
+    def test_cria_usuarios_com_senha_e_flags(self):
+        rows = self._rows('ana', 'bruno')
+        rows[0]['role'] = User.Role.MASTER
+        UserForm.save_many(rows)
+
+        ana = User.objects.get(username='ana')
+        self.assertTrue(ana.check_password('senha-ana'))
+        self.assertTrue(ana.is_superuser)
+        self.assertFalse(User.objects.get(username='bruno').is_superuser)
+
+    def test_limita_os_hashes_paralelos(self):
+        with mock.patch.object(forms, 'ThreadPoolExecutor', wraps=forms.ThreadPoolExecutor) as pool:
+            UserForm.save_many(self._rows('ana'))
+        pool.assert_called_once_with(max_workers=forms._MAX_HASHES_PARALELOS)
+
+    def test_username_existente_falha_sem_criar_nenhum(self):
+        User.objects.create_user('ana')
+        with self.assertRaisesMessage(ValidationError, 'ana'):
+            UserForm.save_many(self._rows('bruno', 'ana'))
+        self.assertFalse(User.objects.filter(username='bruno').exists())
+
+    def test_username_repetido_no_lote_falha_sem_criar_nenhum(self):
+        with self.assertRaisesMessage(ValidationError, 'bruno'):
+            UserForm.save_many(self._rows('bruno', 'carla', 'bruno'))
+        self.assertFalse(User.objects.exists())
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ProcessarPessoasTests(TestCase):
+    """Upsert em lote dos clientes/advogados enviados no formulário de protocolo."""
+
+    CPF = '12345678909'
+    CNPJ = '11222333000181'
+
+    def setUp(self):
+        cache.clear()
+
+    def _processar(self, *linhas, prefixo='cliente'):
+        colunas = ('documento', 'nome', 'telefone', 'email', 'endereco')
+        dados = {
+            f'{prefixo}_{coluna}[]': [linha.get(coluna, '') for linha in linhas]
+            for coluna in colunas
+        } if linhas else {}
+        request = RequestFactory().post('/', dados)
+        return _processar_pessoas_do_post(request, prefixo)
+
+    def _existente(self):
+        return Cliente.objects.create(
+            nome='FULANO', cpf=self.CPF,
+            telefone='11999990000', email='fulano@exemplo.com', endereco='RUA A, 1',
+        )
+
+    def test_post_vazio(self):
+        self.assertEqual(self._processar(), [])
+        self.assertFalse(Cliente.objects.exists())
+
+    def test_nome_sem_documento_e_ignorado(self):
+        pessoas = self._processar(
+            {'documento': '', 'nome': 'SEM DOCUMENTO'},
+            {'documento': self.CPF, 'nome': 'FULANO'},
+        )
+
+        self.assertEqual([p.cpf for p in pessoas], [self.CPF])
+        self.assertFalse(Cliente.objects.filter(nome='SEM DOCUMENTO').exists())
+
+    def test_cpf_existente_com_opcionais_em_branco_mantem_os_dados(self):
+        self._existente()
+        self._processar({'documento': '123.456.789-09', 'nome': 'FULANO DE TAL'})
+
+        cliente = Cliente.objects.get(cpf=self.CPF)
+        self.assertEqual(cliente.nome, 'FULANO DE TAL')
+        self.assertEqual(cliente.telefone, '11999990000')
+        self.assertEqual(cliente.email, 'fulano@exemplo.com')
+        self.assertEqual(cliente.endereco, 'RUA A, 1')
+
+    def test_conflito_concorrente_nao_apaga_opcionais(self):
+        # Cadastro feito por outra requisição depois do SELECT dos existentes:
+        # o registro chega ao INSERT ... ON CONFLICT DO UPDATE
+        self._existente()
+        with mock.patch.object(Cliente.objects, 'filter', return_value=Cliente.objects.none()):
+            pessoas = self._processar({'documento': self.CPF, 'nome': 'FULANO DE TAL', 'telefone': '1133334444'})
+
+        cliente = Cliente.objects.get(cpf=self.CPF)
+        self.assertEqual(pessoas[0].pk, cliente.pk)
+        self.assertEqual(cliente.nome, 'FULANO DE TAL')
+        self.assertEqual(cliente.telefone, '1133334444')
+        self.assertEqual(cliente.email, 'fulano@exemplo.com')
+        self.assertEqual(cliente.endereco, 'RUA A, 1')
+
+    def test_documento_repetido_no_post_gera_um_cliente(self):
+        pessoas = self._processar(
+            {'documento': self.CPF, 'nome': 'FULANO'},
+            {'documento': '123.456.789-09', 'nome': 'FULANO', 'email': 'fulano@exemplo.com'},
+        )
+
+        self.assertEqual(Cliente.objects.count(), 1)
+        self.assertIs(pessoas[0], pessoas[1])
+        self.assertEqual(Cliente.objects.get().email, 'fulano@exemplo.com')
+
+    def test_cpf_e_cnpj_no_mesmo_post(self):
+        pessoas = self._processar(
+            {'documento': self.CPF, 'nome': 'FULANO'},
+            {'documento': '11.222.333/0001-81', 'nome': 'EMPRESA LTDA', 'telefone': '1133334444'},
+        )
+
+        fisica = Cliente.objects.get(cpf=self.CPF)
+        juridica = Cliente.objects.get(cnpj=self.CNPJ)
+        self.assertEqual([p.pk for p in pessoas], [fisica.pk, juridica.pk])
+        self.assertEqual(fisica.tipo_pessoa, Cliente.TipoPessoa.FISICA)
+        self.assertEqual(juridica.tipo_pessoa, Cliente.TipoPessoa.JURIDICA)
+        self.assertEqual(juridica.telefone, '1133334444')
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ExportacaoClientesTests(TestCase):
+    """Exportação CSV de cliente_list (?export=csv)."""
+
+    NOME = '=HYPERLINK("http://exemplo.com","clique")'
+
+    def setUp(self):
+        cache.clear()
+        self.master = User.objects.create_user('master', role=User.Role.MASTER)
+        self.client.force_login(self.master)
+
+    def _exportar(self):
+        response = self.client.get(reverse('cliente_list'), {'export': 'csv'})
+        corpo = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(corpo.splitlines()))
+
+    def test_neutraliza_formulas(self):
+        self.client.post(reverse('cliente_create'), {
+            'nome': self.NOME,
+            'tipo_pessoa': Cliente.TipoPessoa.FISICA,
+            'cpf': '123.456.789-09',
+            'telefone': '+55 11 99999-0000',
+        })
+        self.assertTrue(Cliente.objects.filter(nome=self.NOME).exists())
+
+        cabecalho, linha = self._exportar()
+        self.assertEqual(cabecalho[0], 'Nome')
+        self.assertEqual(linha[0], "'" + self.NOME)
+        self.assertEqual(linha[2], '12345678909')
+        self.assertEqual(linha[4], "'+55 11 99999-0000")
+
+    def test_restrita_aos_perfis_de_gestao(self):
+        escrevente = User.objects.create_user('escrevente', role=User.Role.ESCREVENTE)
+        self.client.force_login(escrevente)
+
+        response = self.client.get(reverse('cliente_list'), {'export': 'csv'})
+        self.assertRedirects(response, reverse('cliente_list'), fetch_redirect_response=False)
+        self.assertNotContains(self.client.get(reverse('cliente_list')), 'export=csv')
@@ -1,16 +1,22 @@
-import re
-import json
+import csv
+import hashlib
+from collections import defaultdict
+from functools import wraps
+from itertools import islice, zip_longest
+from django.apps import apps
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, get_user_model
-from django.contrib.auth.views import LoginView
+from django.contrib.auth.views import LoginView, redirect_to_login
 from django.contrib import messages
-from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.decorators import login_required
 from django.utils import timezone
+from django.core.cache import cache
 from django.core.paginator import Paginator
-from django.db.models import Q
-from django.db import transaction
-from django.http import JsonResponse
-from django.views.decorators.http import require_GET
+from django.db.models import Count, F, Q
+from django.db import connection, transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
 
 from .forms import (
     SetupMasterForm,
@@ -20,37 +26,81 @@ from .forms import (
     ClienteForm,
     ProtocoloCertidaoForm,
 )
+from .cache import (
+    CACHE_KEY_DASHBOARD_STATS,
+    CACHE_TIMEOUT_DASHBOARD_STATS,
+    chave_agenda_do_dia,
+    existe_usuario_cacheado,
+    invalidar_caches_cliente,
+    invalidar_caches_tipo_ato,
+    marcar_existe_usuario,
+    total_cacheado,
+    ultima_alteracao,
+)
 from .models import Protocolo, Cliente, Tabelionato, TipoAto
 
 User = get_user_model()
 
+# Valores dos enums resolvidos uma vez no import (str puras, sem lookup no enum)
+_ST_EM_ANDAMENTO = Protocolo.StatusProtocolo.EM_ANDAMENTO.value
+_ST_ESCRITURA_FINALIZADA = Protocolo.StatusProtocolo.ESCRITURA_FINALIZADA.value
+_ST_CONCLUIDO = Protocolo.StatusProtocolo.CONCLUIDO.value
+_ST_CANCELADO = Protocolo.StatusProtocolo.CANCELADO.value
+_TP_CERTIDAO = Protocolo.TipoProtocolo.CERTIDAO.value
+_ROLE_MASTER = User.Role.MASTER.value
+# Roles com permissão de gestão sobre protocolos de terceiros
+_ROLES_GESTAO = frozenset({User.Role.MASTER.value, User.Role.ADMINISTRATIVO.value})
+# Choices é recalculado a cada acesso na enum; congela uma vez só
+_ROLE_CHOICES = tuple(User.Role.choices)
 
-# ========== DECORATORS DE PERMISSÃO ==========
-
-def is_master(user):
-    """Verifica se o usuário tem role MASTER."""
-    return user.is_authenticated and user.role == User.Role.MASTER
 
+# ========== DECORATORS DE PERMISSÃO ==========
 
 def master_required(view_func):
-    """Decorator que restringe acesso apenas a usuários MASTER."""
-    decorated_view = user_passes_test(
-        is_master,
-        login_url='home',
-        redirect_field_name=None
-    )(view_func)
-    return decorated_view
+    """
+    Decorator que restringe acesso apenas a usuários MASTER.
+    Já cobre o @login_required: anônimos vão para o login (com ?next=),
+    usuários autenticados sem role MASTER voltam para a home.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        user = request.user
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        if user.role != _ROLE_MASTER:
+            return redirect('home')
+        return view_func(request, *args, **kwargs)
+    return _wrapped_view
 
 
 # ========== AUTENTICAÇÃO ==========
 
+def _existe_usuario():
+    """
+    Indica se já há algum usuário cadastrado (setup concluído).
+    A passagem de "sem usuários" para "com usuários" é definitiva
+    (não é possível excluir a própria conta), então o True fica em cache
+    sem expiração (e na AppConfig, dispensando até o acesso ao cache daí
+    em diante no processo); o False nunca é cacheado.
+    """
+    app_config = apps.get_app_config('core')
+    if app_config.setup_concluido:
+        return True
+    if not existe_usuario_cacheado():
+        if not User.objects.exists():
+            return False
+        marcar_existe_usuario()
+    app_config.setup_concluido = True
+    return True
+
+
 class CustomLoginView(LoginView):
     template_name = 'core/login.html'
     redirect_authenticated_user = True
 
     def dispatch(self, request, *args, **kwargs):
         # VERIFICAÇÃO DE SEGURANÇA: Se não há usuários, força o setup
-        if not User.objects.exists():
+        if not _existe_usuario():
             return redirect('setup_system')
         return super().dispatch(request, *args, **kwargs)
 
@@ -59,14 +109,27 @@ def setup_system(request):
     """
     View de Instalação: Só funciona se não houver NENHUM usuário no banco.
     """
-    if User.objects.exists():
+    if _existe_usuario():
         messages.warning(request, "O sistema já possui um administrador configurado.")
         return redirect('login')
 
     if request.method == 'POST':
         form = SetupMasterForm(request.POST)
         if form.is_valid():
-            user = form.save()
+            with transaction.atomic():
+                # Serializa instalações concorrentes: a segunda aguarda a primeira
+                # e, ao revalidar, encontra o Master já criado
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'LOCK TABLE {connection.ops.quote_name(User._meta.db_table)} '
+                        'IN SHARE ROW EXCLUSIVE MODE'
+                    )
+                if User.objects.exists():
+                    messages.warning(request, "O sistema já possui um administrador configurado.")
+                    return redirect('login')
+                user = form.save()
+            marcar_existe_usuario()
+            apps.get_app_config('core').setup_concluido = True
             # Loga o usuário automaticamente após criar
             login(request, user)
             messages.success(request, f"Sistema configurado! Bem-vindo, {user.first_name}.")
@@ -79,35 +142,67 @@ def setup_system(request):
 
 # ========== HOME / DASHBOARD ==========
 
+def _calcular_estatisticas():
+    """Contagem de protocolos por status (uma única consulta com COUNT FILTER) e de clientes."""
+    stats = Protocolo.objects.aggregate(
+        em_andamento=Count('pk', filter=Q(status=_ST_EM_ANDAMENTO)),
+        escritura_finalizada=Count('pk', filter=Q(status=_ST_ESCRITURA_FINALIZADA)),
+        concluido=Count('pk', filter=Q(status=_ST_CONCLUIDO)),
+        cancelado=Count('pk', filter=Q(status=_ST_CANCELADO)),
+    )
+    stats['clientes'] = Cliente.objects.count()
+    return stats
+
+
+def _etag(*escopos, diario=False):
+    """
+    Fábrica de etag_func para @condition: combina os instantes exatos da
+    última alteração dos escopos (core.cache.ultima_alteracao, sem consulta
+    ao banco) com a sessão, já que a página traz o usuário e o token CSRF.
+    Diferente do Last-Modified (resolução de 1 s), qualquer escrita entre
+    dois GETs muda o valor. Com mensagens pendentes a página precisa ser
+    renderizada, então não há ETag.
+    """
+    def etag(request, *args, **kwargs):
+        if messages.get_messages(request):
+            return None
+        partes = [request.session.session_key or '', ultima_alteracao(*escopos).isoformat()]
+        if diario:
+            # A agenda e a data exibida mudam à meia-noite, mesmo sem escritas
+            partes.append(timezone.localdate().isoformat())
+        return hashlib.md5('|'.join(partes).encode(), usedforsecurity=False).hexdigest()
+    return etag
+
+
+# Só o navegador guarda a página, sempre revalidando com If-None-Match
+_revalidar = cache_control(private=True, no_cache=True)
+
+
 @login_required
+@_revalidar
+@condition(etag_func=_etag('protocolo', 'cliente', 'tipo_ato', 'user', diario=True))
 def home(request):
     """
     View da página inicial (Dashboard) com estatísticas.
     """
     today = timezone.localdate()
     
-    # Estatísticas de Protocolos por Status
-    stats = {
-        'em_andamento': Protocolo.objects.filter(
-            status=Protocolo.StatusProtocolo.EM_ANDAMENTO
-        ).count(),
-        'escritura_finalizada': Protocolo.objects.filter(
-            status=Protocolo.StatusProtocolo.ESCRITURA_FINALIZADA
-        ).count(),
-        'concluido': Protocolo.objects.filter(
-            status=Protocolo.StatusProtocolo.CONCLUIDO
-        ).count(),
-        'cancelado': Protocolo.objects.filter(
-            status=Protocolo.StatusProtocolo.CANCELADO
-        ).count(),
-        'clientes': Cliente.objects.count(),
-    }
+    # Estatísticas de Protocolos por Status (cacheadas)
+    stats = cache.get_or_set(
+        CACHE_KEY_DASHBOARD_STATS, _calcular_estatisticas, CACHE_TIMEOUT_DASHBOARD_STATS
+    )
     
-    # Agendamentos do dia
-    agendamentos = Protocolo.objects.filter(
-        data_agendamento=today,
-        status=Protocolo.StatusProtocolo.EM_ANDAMENTO
-    ).select_related('tipo_ato').order_by('horario_agendamento')[:5]
+    # Agendamentos do dia (cacheados por data)
+    agendamentos = cache.get_or_set(
+        chave_agenda_do_dia(today),
+        lambda: list(Protocolo.objects.filter(
+            data_agendamento=today,
+            status=_ST_EM_ANDAMENTO
+        ).select_related('tipo_ato').only(
+            'numero_protocolo', 'horario_agendamento', 'tipo_ato__nome'
+        ).order_by('horario_agendamento')[:5]),
+        CACHE_TIMEOUT_DASHBOARD_STATS,
+    )
     
     context = {
         'today': today,
@@ -118,13 +213,81 @@ def home(request):
     return render(request, 'core/home.html', context)
 
 
+# ========== PAGINAÇÃO ==========
+
+def _paginar_por_pk(queryset, por_pagina, numero_pagina, total=None):
+    """
+    Paginação em duas etapas: o OFFSET/LIMIT percorre apenas os PKs
+    (consulta estreita) e as linhas completas são buscadas só para os
+    registros da página, via pk__in. Mantém a ordenação do queryset.
+    Com `total` informado, o Paginator não executa o COUNT(*).
+    """
+    paginator = Paginator(queryset.values_list('pk', flat=True), por_pagina)
+    if total is not None:
+        paginator.count = total
+    page = paginator.get_page(numero_pagina)
+    pks = list(page.object_list)
+    objetos = {obj.pk: obj for obj in queryset.order_by().filter(pk__in=pks)}
+    page.object_list = [objetos[pk] for pk in pks if pk in objetos]
+    return page
+
+
+def _paginar_por_keyset(queryset, por_pagina, campo, after):
+    """
+    Navegação sequencial para páginas profundas, na mesma ordem da listagem
+    numerada (`campo`, com o pk como desempate; '-campo' para decrescente).
+    O cursor é o pk do último registro exibido: o valor de `campo` dele é
+    lido pela PK e a página sai de WHERE (campo, pk) > (valor, after) LIMIT n,
+    sem OFFSET, pelo índice (campo, id).
+    Retorna os objetos da página e o pk do cursor seguinte (ou None); se o
+    registro do cursor não existe mais, retorna None no lugar dos objetos.
+    """
+    nome = campo.lstrip('-')
+    valor = queryset.model._default_manager.values_list(nome, flat=True).filter(pk=after).first()
+    if valor is None:
+        return None, None
+    if campo.startswith('-'):
+        depois = Q(**{f'{nome}__lte': valor}) & (Q(**{f'{nome}__lt': valor}) | Q(pk__lt=after))
+        ordem = (campo, '-pk')
+    else:
+        depois = Q(**{f'{nome}__gte': valor}) & (Q(**{f'{nome}__gt': valor}) | Q(pk__gt=after))
+        ordem = (campo, 'pk')
+    objetos = list(queryset.filter(depois).order_by(*ordem)[:por_pagina + 1])
+    if len(objetos) > por_pagina:
+        return objetos[:por_pagina], objetos[por_pagina - 1].pk
+    return objetos, None
+
+
+def _paginar_lista(request, queryset, por_pagina, campo, total=None):
+    """
+    Usa o keyset quando a URL traz ?after=<pk>; senão, a paginação numerada,
+    ambas ordenadas por `campo` e pk. Na numerada, `proximo_after` permite
+    seguir a partir da página atual em modo sequencial.
+    `total` é um callable opcional que fornece o COUNT (só chamado na numerada).
+    """
+    after = request.GET.get('after', '')
+    if after.isdigit():
+        page, proximo_after = _paginar_por_keyset(queryset, por_pagina, campo, int(after))
+        if page is not None:
+            return page, {'keyset': True, 'proximo_after': proximo_after}
+    total = total() if total is not None else None
+    ordem = (campo, '-pk' if campo.startswith('-') else 'pk')
+    page = _paginar_por_pk(queryset.order_by(*ordem), por_pagina, request.GET.get('page', 1), total)
+    proximo_after = page.object_list[-1].pk if page.has_next() else None
+    return page, {'keyset': False, 'proximo_after': proximo_after}
+
+
 # ========== CRUD DE USUÁRIOS ==========
 
-@login_required
 @master_required
+@_revalidar
+@condition(etag_func=_etag('user'))
 def user_list(request):
     """Lista todos os usuários do sistema."""
-    users = User.objects.all().order_by('-date_joined')
+    # Apenas as colunas exibidas na listagem (sem hash de senha, last_login...)
+    users = User.objects.only(
+        'username', 'first_name', 'last_name', 'email', 'role', 'is_active', 'date_joined'
+    ).order_by('-date_joined', '-pk')
     
     # Busca por nome ou username
     search = request.GET.get('search', '').strip()
@@ -148,23 +311,24 @@ def user_list(request):
     elif status_filter == 'inactive':
         users = users.filter(is_active=False)
     
-    # Paginação
-    paginator = Paginator(users, 20)
-    page = request.GET.get('page', 1)
-    users_page = paginator.get_page(page)
+    # Paginação (numerada ou sequencial via ?after=<pk>); sem filtros, o total vem do cache
+    total = None if search or role_filter or status_filter else (
+        lambda: total_cacheado('user', User.objects)
+    )
+    users_page, paginacao = _paginar_lista(request, users, 20, '-date_joined', total)
     
     context = {
         'users': users_page,
         'search': search,
         'role_filter': role_filter,
         'status_filter': status_filter,
-        'roles': User.Role.choices,
+        'roles': _ROLE_CHOICES,
+        **paginacao,
     }
     
     return render(request, 'core/user_list.html', context)
 
 
-@login_required
 @master_required
 def user_create(request):
     """Cria um novo usuário."""
@@ -186,7 +350,6 @@ def user_create(request):
     return render(request, 'core/user_form.html', context)
 
 
-@login_required
 @master_required
 def user_update(request, pk):
     """Edita um usuário existente."""
@@ -211,20 +374,23 @@ def user_update(request, pk):
     return render(request, 'core/user_form.html', context)
 
 
-@login_required
 @master_required
 def user_delete(request, pk):
     """Remove um usuário do sistema."""
-    user_obj = get_object_or_404(User, pk=pk)
-    
     # Impede que o usuário delete a si mesmo
-    if user_obj == request.user:
+    if pk == request.user.pk:
         messages.error(request, 'Você não pode excluir sua própria conta.')
         return redirect('user_list')
     
     if request.method == 'POST':
-        username = user_obj.username
-        user_obj.delete()
+        # Lock da linha até o fim da cascata: inserções concorrentes que a
+        # referenciam aguardam o commit em vez de competir com o delete
+        with transaction.atomic():
+            user_obj = get_object_or_404(
+                User.objects.select_for_update().only('username'), pk=pk
+            )
+            username = user_obj.username
+            user_obj.delete()
         messages.success(request, f'Usuário "{username}" excluído com sucesso!')
         return redirect('user_list')
     
@@ -234,7 +400,6 @@ def user_delete(request, pk):
 
 # ========== CONFIGURAÇÕES DO SISTEMA ==========
 
-@login_required
 @master_required
 def settings_view(request):
     """
@@ -242,7 +407,9 @@ def settings_view(request):
     - Aba 1: Dados do Tabelionato (Singleton)
     - Aba 2: Tipos de Atos
     """
-    # Recupera ou cria instância do Tabelionato (Singleton)
+    # Recupera ou cria instância do Tabelionato (Singleton). Lido sempre do
+    # banco: o form é vinculado a esta instância, e uma cópia antiga
+    # regravaria valores já alterados (lost update)
     tabelionato = Tabelionato.objects.first()
     
     # Determina qual aba está ativa
@@ -266,7 +433,7 @@ def settings_view(request):
             tabelionato_form = TabelionatoForm()
     
     # Lista de Tipos de Ato
-    tipos_ato = TipoAto.objects.all().order_by('nome')
+    tipos_ato = TipoAto.objects.order_by('nome')
     
     context = {
         'tabelionato_form': tabelionato_form,
@@ -278,7 +445,6 @@ def settings_view(request):
     return render(request, 'core/settings.html', context)
 
 
-@login_required
 @master_required
 def tipo_ato_create(request):
     """Cria um novo Tipo de Ato."""
@@ -300,7 +466,6 @@ def tipo_ato_create(request):
     return render(request, 'core/tipo_ato_form.html', context)
 
 
-@login_required
 @master_required
 def tipo_ato_update(request, pk):
     """Edita um Tipo de Ato existente."""
@@ -325,42 +490,100 @@ def tipo_ato_update(request, pk):
     return render(request, 'core/tipo_ato_form.html', context)
 
 
-@login_required
 @master_required
 def tipo_ato_delete(request, pk):
     """Exclui um Tipo de Ato (exclusão física)."""
-    tipo_ato = get_object_or_404(TipoAto, pk=pk)
-    
     if request.method == 'POST':
-        nome = tipo_ato.nome
-        tipo_ato.delete()
+        # Mesmo lock de linha do user_delete, durante a verificação do PROTECT
+        with transaction.atomic():
+            tipo_ato = get_object_or_404(
+                TipoAto.objects.select_for_update().only('nome'), pk=pk
+            )
+            nome = tipo_ato.nome
+            tipo_ato.delete()
         messages.success(request, f'Tipo de Ato "{nome}" excluído com sucesso!')
         return redirect('settings_view')
     
     return redirect('settings_view')
 
 
-@login_required
 @master_required
 def tipo_ato_toggle(request, pk):
     """Alterna o status ativo/inativo de um Tipo de Ato."""
-    tipo_ato = get_object_or_404(TipoAto, pk=pk)
-    
     if request.method == 'POST':
-        tipo_ato.ativo = not tipo_ato.ativo
-        tipo_ato.save()
-        status = 'ativado' if tipo_ato.ativo else 'desativado'
-        messages.success(request, f'Tipo de Ato "{tipo_ato.nome}" {status} com sucesso!')
+        # Inversão atômica no banco (UPDATE ... SET ativo = NOT ativo), sem
+        # carregar a instância nem risco de perder um toggle concorrente
+        if not TipoAto.objects.filter(pk=pk).update(ativo=~F('ativo')):
+            raise Http404('Tipo de Ato não encontrado.')
+        # update() não dispara post_save
+        invalidar_caches_tipo_ato()
+        nome, ativo = TipoAto.objects.values_list('nome', 'ativo').get(pk=pk)
+        status = 'ativado' if ativo else 'desativado'
+        messages.success(request, f'Tipo de Ato "{nome}" {status} com sucesso!')
     
     return redirect('settings_view')
 
 
 # ========== CRUD DE CLIENTES ==========
 
+class _Eco:
+    """Pseudo-buffer para o csv.writer: devolve a linha em vez de acumulá-la."""
+    def write(self, valor):
+        return valor
+
+
+# Inícios de célula que o Excel/LibreOffice interpretam como fórmula
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _celula_csv(valor):
+    """
+    Texto digitado pelo usuário como célula do CSV. Valores iniciados por
+    um caractere de fórmula recebem um apóstrofo na frente (CSV injection).
+    """
+    if not valor:
+        return ''
+    return "'" + valor if valor.startswith(_INICIO_FORMULA) else valor
+
+
+def _exportar_clientes_csv(clientes):
+    """
+    CSV dos clientes em streaming: as linhas vêm do banco em blocos
+    (iterator com cursor do lado do servidor) e são enviadas conforme
+    geradas, com memória constante qualquer que seja o tamanho da tabela.
+    """
+    writer = csv.writer(_Eco())
+    tipos = dict(Cliente.TipoPessoa.choices)
+    
+    def linhas():
+        # BOM para o Excel reconhecer o UTF-8 (acentos)
+        yield '\ufeff' + writer.writerow(['Nome', 'Tipo de Pessoa', 'CPF', 'CNPJ', 'Telefone', 'E-mail'])
+        for nome, tipo, cpf, cnpj, telefone, email in clientes.values_list(
+            'nome', 'tipo_pessoa', 'cpf', 'cnpj', 'telefone', 'email'
+        ).iterator(chunk_size=2000):
+            yield writer.writerow([
+                _celula_csv(nome),
+                tipos.get(tipo, tipo),
+                _celula_csv(cpf),
+                _celula_csv(cnpj),
+                _celula_csv(telefone),
+                _celula_csv(email),
+            ])
+    
+    response = StreamingHttpResponse(linhas(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="clientes.csv"'
+    return response
+
+
 @login_required
+@_revalidar
+@condition(etag_func=_etag('cliente', 'user'))
 def cliente_list(request):
     """Lista todos os clientes com busca e paginação."""
-    clientes = Cliente.objects.all().order_by('nome')
+    # Apenas as colunas exibidas na listagem (sem o endereço, TextField)
+    clientes = Cliente.objects.only(
+        'nome', 'tipo_pessoa', 'cpf', 'cnpj', 'telefone', 'email'
+    ).order_by('nome', 'pk')
     
     # Busca por nome, CPF ou CNPJ
     search = request.GET.get('search', '').strip()
@@ -377,16 +600,28 @@ def cliente_list(request):
     if tipo_filter:
         clientes = clientes.filter(tipo_pessoa=tipo_filter)
     
-    # Paginação
-    paginator = Paginator(clientes, 20)
-    page = request.GET.get('page', 1)
-    clientes_page = paginator.get_page(page)
+    # Exportação da lista filtrada (?export=csv), sem paginação. Traz CPF/CNPJ
+    # e contatos de todos os clientes: restrita aos perfis de gestão
+    pode_exportar = request.user.role in _ROLES_GESTAO
+    if request.GET.get('export') == 'csv':
+        if not pode_exportar:
+            messages.error(request, 'Você não tem permissão para exportar clientes.')
+            return redirect('cliente_list')
+        return _exportar_clientes_csv(clientes)
+    
+    # Paginação (numerada ou sequencial via ?after=<pk>); sem filtros, o total vem do cache
+    total = None if search or tipo_filter else (
+        lambda: total_cacheado('cliente', Cliente.objects)
+    )
+    clientes_page, paginacao = _paginar_lista(request, clientes, 20, 'nome', total)
     
     context = {
         'clientes': clientes_page,
         'search': search,
         'tipo_filter': tipo_filter,
         'tipos_pessoa': Cliente.TipoPessoa.choices,
+        'pode_exportar': pode_exportar,
+        **paginacao,
     }
     
     return render(request, 'core/cliente_list.html', context)
@@ -449,7 +684,7 @@ def api_buscar_cliente(request):
     documento = request.GET.get('documento', '').strip()
     
     # Remove pontuação
-    documento_limpo = re.sub(r'\D', '', documento)
+    documento_limpo = _limpar_documento(documento)
     
     if not documento_limpo:
         return JsonResponse({
@@ -462,20 +697,26 @@ def api_buscar_cliente(request):
             'endereco': ''
         })
     
-    # Busca por CPF ou CNPJ
-    cliente = Cliente.objects.filter(
-        Q(cpf=documento_limpo) | Q(cnpj=documento_limpo)
+    # Busca por CPF ou CNPJ: pelo tamanho, cada caso é uma sonda no índice
+    # único da coluna (o OR só fica para documentos fora do padrão)
+    if len(documento_limpo) == 11:
+        filtro = Q(cpf=documento_limpo)
+    elif len(documento_limpo) == 14:
+        filtro = Q(cnpj=documento_limpo)
+    else:
+        filtro = Q(cpf=documento_limpo) | Q(cnpj=documento_limpo)
+    # dict direto do cursor, sem instanciar o model
+    cliente = Cliente.objects.filter(filtro).values(
+        'id', 'nome', 'tipo_pessoa', 'telefone', 'email', 'endereco'
     ).first()
     
     if cliente:
         return JsonResponse({
             'found': True,
-            'id': cliente.id,
-            'nome': cliente.nome,
-            'tipo_pessoa': cliente.tipo_pessoa,
-            'telefone': cliente.telefone or '',
-            'email': cliente.email or '',
-            'endereco': cliente.endereco or '',
+            **cliente,
+            'telefone': cliente['telefone'] or '',
+            'email': cliente['email'] or '',
+            'endereco': cliente['endereco'] or '',
         })
     
     return JsonResponse({
@@ -492,10 +733,15 @@ def api_buscar_cliente(request):
 # ========== PROTOCOLOS - CERTIDÃO ==========
 
 def _limpar_documento(valor):
-    """Remove pontuação de documento, mantendo apenas números."""
-    if valor:
-        return re.sub(r'\D', '', valor)
-    return None
+    """Remove pontuação de documento, mantendo apenas números ('' se vazio)."""
+    if not valor or valor.isdecimal():
+        # Caso comum: o front-end já enviou só dígitos
+        return valor or ''
+    # Mesmo critério do ClienteForm; mais rápido que re.sub(r'\D', ...)
+    return ''.join(filter(str.isdecimal, valor))
+
+
+_CAMPOS_PESSOA = ['nome', 'tipo_pessoa', 'telefone', 'email', 'endereco']
 
 
 def _processar_pessoas_do_post(request, prefixo, apenas_cpf=False):
@@ -503,7 +749,10 @@ def _processar_pessoas_do_post(request, prefixo, apenas_cpf=False):
     Processa os dados de clientes/advogados enviados via POST.
     Retorna lista de objetos Cliente (criados ou atualizados).
     
-    Usa update_or_create para manter cadastros atualizados.
+    Mantém os cadastros atualizados (como um update_or_create por CPF/CNPJ),
+    mas em lote: um SELECT para os já cadastrados, um bulk_update para os
+    alterados e um bulk_create (ON CONFLICT) por tipo de documento e
+    conjunto de campos enviados.
     
     Parâmetros:
     - prefixo: 'cliente' ou 'advogado'
@@ -515,46 +764,48 @@ def _processar_pessoas_do_post(request, prefixo, apenas_cpf=False):
     - {prefixo}_telefone[]
     - {prefixo}_email[]
     - {prefixo}_endereco[]
-    - {prefixo}_id[] (opcional, para clientes já existentes)
     """
     documentos = request.POST.getlist(f'{prefixo}_documento[]')
+    if not documentos:
+        return []
     nomes = request.POST.getlist(f'{prefixo}_nome[]')
     telefones = request.POST.getlist(f'{prefixo}_telefone[]')
     emails = request.POST.getlist(f'{prefixo}_email[]')
     enderecos = request.POST.getlist(f'{prefixo}_endereco[]')
-    ids = request.POST.getlist(f'{prefixo}_id[]')
     
-    pessoas = []
+    # 1ª passada: interpreta as linhas -> (campo único, documento, dados)
+    linhas = []
     
-    for i, doc in enumerate(documentos):
+    # Uma linha por documento; listas mais curtas completam com ''
+    colunas = islice(
+        zip_longest(documentos, nomes, telefones, emails, enderecos, fillvalue=''),
+        len(documentos),
+    )
+    for doc, nome, telefone, email, endereco in colunas:
         doc_limpo = _limpar_documento(doc)
-        nome = nomes[i].strip() if i < len(nomes) else ''
-        telefone = telefones[i].strip() if i < len(telefones) else ''
-        email = emails[i].strip() if i < len(emails) else ''
-        endereco = enderecos[i].strip() if i < len(enderecos) else ''
-        cliente_id = ids[i] if i < len(ids) else ''
+        nome = nome.strip()
+        telefone = telefone.strip()
+        email = email.strip()
+        endereco = endereco.strip()
         
-        if not doc_limpo and not nome:
-            continue  # Linha vazia
+        if not nome:
+            continue  # Linha vazia ou sem nome, não cria
+        if not doc_limpo:
+            # Sem documento, não cria: o model exige CPF (física) ou CNPJ (jurídica)
+            continue
         
         # Determina tipo de pessoa pelo tamanho do documento
         # Se apenas_cpf=True (advogado), força pessoa física
         if apenas_cpf or len(doc_limpo) == 11:
             tipo_pessoa = Cliente.TipoPessoa.FISICA
-            cpf = doc_limpo[:11] if doc_limpo else None  # Garante máximo 11 dígitos
-            cnpj = None
+            campo, documento = 'cpf', doc_limpo[:11]  # Garante máximo 11 dígitos
         elif len(doc_limpo) == 14:
             tipo_pessoa = Cliente.TipoPessoa.JURIDICA
-            cpf = None
-            cnpj = doc_limpo
+            campo, documento = 'cnpj', doc_limpo
         else:
             # Documento inválido, tenta como CPF
             tipo_pessoa = Cliente.TipoPessoa.FISICA
-            cpf = doc_limpo if doc_limpo else None
-            cnpj = None
-        
-        if not nome:
-            continue  # Sem nome, não cria
+            campo, documento = 'cpf', doc_limpo
         
         # Dados para criar/atualizar
         dados_cliente = {
@@ -570,32 +821,104 @@ def _processar_pessoas_do_post(request, prefixo, apenas_cpf=False):
         if endereco:
             dados_cliente['endereco'] = endereco
         
-        # Usa update_or_create para criar ou atualizar o cliente
-        if cpf:
-            cliente, created = Cliente.objects.update_or_create(
-                cpf=cpf,
-                defaults=dados_cliente
-            )
-        elif cnpj:
-            cliente, created = Cliente.objects.update_or_create(
-                cnpj=cnpj,
-                defaults=dados_cliente
-            )
+        linhas.append((campo, documento, dados_cliente))
+    
+    if not linhas:
+        return []
+    
+    # Cadastros já existentes, em uma única consulta
+    cpfs = [doc for campo, doc, _ in linhas if campo == 'cpf']
+    cnpjs = [doc for campo, doc, _ in linhas if campo == 'cnpj']
+    existentes = {}
+    for c in Cliente.objects.filter(Q(cpf__in=cpfs) | Q(cnpj__in=cnpjs)):
+        existentes[('cpf', c.cpf) if c.cpf in cpfs else ('cnpj', c.cnpj)] = c
+    
+    # 2ª passada: aplica os dados (documento repetido no POST = mesmo objeto)
+    pessoas = []
+    alterados = {}
+    novos = {'cpf': {}, 'cnpj': {}}
+    # Campos preenchidos no POST para cada novo (campo, documento)
+    campos_postados = {}
+    
+    for campo, documento, dados_cliente in linhas:
+        chave = (campo, documento)
+        cliente = existentes.get(chave) or novos[campo].get(documento)
+        if cliente is None:
+            cliente = novos[campo][documento] = Cliente(**{campo: documento}, **dados_cliente)
+            campos_postados[chave] = set(dados_cliente)
         else:
-            # Sem documento válido, cria novo apenas pelo nome (caso especial)
-            cliente = Cliente.objects.create(**dados_cliente)
-        
+            if chave in campos_postados:
+                campos_postados[chave].update(dados_cliente)
+            if any(getattr(cliente, k) != v for k, v in dados_cliente.items()):
+                for k, v in dados_cliente.items():
+                    setattr(cliente, k, v)
+                if chave in existentes:
+                    alterados[cliente.pk] = cliente
         pessoas.append(cliente)
     
+    # bulk_* não chamam save(): mantém a validação do model (sem as
+    # consultas de unicidade, resolvidas pelo próprio upsert abaixo)
+    criados = list(novos['cpf'].values()) + list(novos['cnpj'].values())
+    for cliente in criados + list(alterados.values()):
+        cliente.full_clean(validate_unique=False)
+    
+    if alterados:
+        Cliente.objects.bulk_update(alterados.values(), _CAMPOS_PESSOA)
+    # ON CONFLICT cobre um cadastro concorrente do mesmo documento e só
+    # sobrescreve os campos enviados (opcionais em branco não viram NULL),
+    # então os novos são agrupados pelo conjunto de campos preenchidos
+    lotes = defaultdict(list)
+    for (campo, documento), campos in campos_postados.items():
+        update_fields = tuple(c for c in _CAMPOS_PESSOA if c in campos)
+        lotes[campo, update_fields].append(novos[campo][documento])
+    for (campo, update_fields), objetos in lotes.items():
+        Cliente.objects.bulk_create(
+            objetos,
+            update_conflicts=True,
+            unique_fields=[campo],
+            update_fields=list(update_fields),
+        )
+    
+    if alterados or criados:
+        # bulk_* não disparam post_save: invalida como os sinais de Cliente
+        invalidar_caches_cliente()
+    
     return pessoas
 
 
+def _vincular_pessoas(protocolo, relacao, pessoas):
+    """
+    Vincula clientes/advogados a um protocolo recém-criado com um único
+    INSERT na tabela intermediária. Como o protocolo é novo, não há vínculos
+    a comparar (o .set() faria SELECT + diff antes do INSERT). Documentos
+    repetidos no POST são absorvidos pelo ignore_conflicts.
+    Não dispara m2m_changed (não há receivers para ele no projeto).
+    """
+    campo = Protocolo._meta.get_field(relacao)
+    Through = campo.remote_field.through
+    coluna_protocolo = campo.m2m_field_name()
+    coluna_cliente = campo.m2m_reverse_field_name()
+    Through.objects.bulk_create(
+        [Through(**{coluna_protocolo: protocolo, coluna_cliente: p}) for p in pessoas],
+        ignore_conflicts=True,
+    )
+
+
 def _processar_lista_documentos(request):
     """Processa a lista de documentos enviada via POST."""
     documentos = request.POST.getlist('documento_item[]')
     return [doc.strip() for doc in documentos if doc.strip()]
 
 
+def _protocolos_para_formulario():
+    """
+    Protocolos com tudo que o formulário de certidão exibe: FKs via JOIN e
+    clientes/advogados prefetchados (o .all()/.exists() do template e das
+    listas de dados usam o cache, sem consultas extras).
+    """
+    return Protocolo.objects.with_refs().prefetch_related('clientes', 'advogados')
+
+
 @login_required
 @transaction.atomic
 def protocolo_certidao_create(request):
@@ -604,12 +927,12 @@ def protocolo_certidao_create(request):
     Processa clientes, advogados e documentos manualmente.
     """
     if request.method == 'POST':
-        form = ProtocoloCertidaoForm(request.POST, user=request.user)
+        form = ProtocoloCertidaoForm(request.POST, user=request.user, request=request)
         
         if form.is_valid():
             # Salva o protocolo (numero_protocolo é gerado automaticamente no model)
             protocolo = form.save(commit=False)
-            protocolo.tipo = Protocolo.TipoProtocolo.CERTIDAO
+            protocolo.tipo = _TP_CERTIDAO
             protocolo.criado_por = request.user
             # responsavel já vem do form
             
@@ -621,47 +944,22 @@ def protocolo_certidao_create(request):
             # Processa clientes (solicitantes) - permite CPF ou CNPJ
             clientes = _processar_pessoas_do_post(request, 'cliente', apenas_cpf=False)
             if clientes:
-                protocolo.clientes.set(clientes)
+                _vincular_pessoas(protocolo, 'clientes', clientes)
             
             # Processa advogados (se houver) - apenas CPF (pessoa física)
             tem_advogado = request.POST.get('tem_advogado') == 'on'
             if tem_advogado:
                 advogados = _processar_pessoas_do_post(request, 'advogado', apenas_cpf=True)
                 if advogados:
-                    protocolo.advogados.set(advogados)
+                    _vincular_pessoas(protocolo, 'advogados', advogados)
             
             messages.success(request, f'Protocolo {protocolo.numero_protocolo} criado com sucesso!')
             
-            # Recarrega o protocolo para garantir dados atualizados
-            protocolo.refresh_from_db()
-            
-            # Prepara dados para o template
-            clientes_data = [
-                {
-                    'id': c.id, 
-                    'documento': c.cpf or c.cnpj or '', 
-                    'nome': c.nome,
-                    'telefone': c.telefone or '',
-                    'email': c.email or '',
-                    'endereco': c.endereco or '',
-                }
-                for c in protocolo.clientes.all()
-            ]
-            advogados_data = [
-                {
-                    'id': a.id, 
-                    'documento': a.cpf or a.cnpj or '', 
-                    'nome': a.nome,
-                    'telefone': a.telefone or '',
-                    'email': a.email or '',
-                    'endereco': a.endereco or '',
-                }
-                for a in protocolo.advogados.all()
-            ]
-            documentos_data = protocolo.lista_documentos or []
+            # Recarrega o protocolo já com FKs e M2M usados no template (sem N+1)
+            protocolo = _protocolos_para_formulario().get(pk=protocolo.pk)
             
             # Recria o form com a instância salva para exibir os dados
-            form = ProtocoloCertidaoForm(instance=protocolo, user=request.user)
+            form = ProtocoloCertidaoForm(instance=protocolo, user=request.user, request=request)
             
             context = {
                 'form': form,
@@ -669,10 +967,6 @@ def protocolo_certidao_create(request):
                 'button_text': 'Salvar Protocolo',
                 'is_edit': True,
                 'protocolo': protocolo,
-                'clientes_data': json.dumps(clientes_data),
-                'advogados_data': json.dumps(advogados_data),
-                'documentos_data': json.dumps(documentos_data),
-                'has_advogados': protocolo.advogados.exists(),
                 'success': True,  # Indica que o protocolo foi salvo com sucesso
             }
             return render(request, 'core/protocolo_certidao_form.html', context)
@@ -680,17 +974,13 @@ def protocolo_certidao_create(request):
             # Form inválido, recupera dados para repopular
             pass
     else:
-        form = ProtocoloCertidaoForm(user=request.user)
+        form = ProtocoloCertidaoForm(user=request.user, request=request)
     
     context = {
         'form': form,
         'title': 'Novo Protocolo de Certidão',
         'button_text': 'Salvar Protocolo',
         'is_edit': False,
-        'clientes_data': json.dumps([]),
-        'advogados_data': json.dumps([]),
-        'documentos_data': json.dumps([]),
-        'has_advogados': False,
         'success': False,
     }
     return render(request, 'core/protocolo_certidao_form.html', context)
@@ -703,20 +993,20 @@ def protocolo_certidao_update(request, pk):
     Edita um protocolo do tipo Certidão existente.
     """
     protocolo = get_object_or_404(
-        Protocolo,
+        _protocolos_para_formulario(),
         pk=pk,
-        tipo=Protocolo.TipoProtocolo.CERTIDAO
+        tipo=_TP_CERTIDAO
     )
     
     success = False
     
     if request.method == 'POST':
-        form = ProtocoloCertidaoForm(request.POST, instance=protocolo, user=request.user)
+        form = ProtocoloCertidaoForm(request.POST, instance=protocolo, user=request.user, request=request)
         
         if form.is_valid():
             # Salva o protocolo
             protocolo = form.save(commit=False)
-            protocolo.tipo = Protocolo.TipoProtocolo.CERTIDAO
+            protocolo.tipo = _TP_CERTIDAO
             
             # Processa lista de documentos
             protocolo.lista_documentos = _processar_lista_documentos(request)
@@ -728,41 +1018,16 @@ def protocolo_certidao_update(request, pk):
 
             messages.success(request, f'Protocolo {protocolo.numero_protocolo} atualizado com sucesso!')
             
-            # Recarrega o protocolo para garantir dados atualizados
-            protocolo.refresh_from_db()
+            # Recarrega o protocolo (refresh_from_db descartaria os prefetches)
+            protocolo = _protocolos_para_formulario().get(pk=protocolo.pk)
             
             # Recria o form com a instância salva para exibir os dados
-            form = ProtocoloCertidaoForm(instance=protocolo, user=request.user)
+            form = ProtocoloCertidaoForm(instance=protocolo, user=request.user, request=request)
             
             # Marca como sucesso
             success = True
     else:
-        form = ProtocoloCertidaoForm(instance=protocolo, user=request.user)
-    
-    # Prepara dados para o template (incluindo dados completos para edição)
-    clientes_data = [
-        {
-            'id': c.id, 
-            'documento': c.cpf or c.cnpj or '', 
-            'nome': c.nome,
-            'telefone': c.telefone or '',
-            'email': c.email or '',
-            'endereco': c.endereco or '',
-        }
-        for c in protocolo.clientes.all()
-    ]
-    advogados_data = [
-        {
-            'id': a.id, 
-            'documento': a.cpf or a.cnpj or '', 
-            'nome': a.nome,
-            'telefone': a.telefone or '',
-            'email': a.email or '',
-            'endereco': a.endereco or '',
-        }
-        for a in protocolo.advogados.all()
-    ]
-    documentos_data = protocolo.lista_documentos or []
+        form = ProtocoloCertidaoForm(instance=protocolo, user=request.user, request=request)
     
     context = {
         'form': form,
@@ -770,18 +1035,14 @@ def protocolo_certidao_update(request, pk):
         'button_text': 'Atualizar Protocolo',
         'is_edit': True,
         'protocolo': protocolo,
-        'clientes_data': json.dumps(clientes_data),  # Mantido para compatibilidade (agora read-only)
-        'advogados_data': json.dumps(advogados_data),  # Mantido para compatibilidade (agora read-only)
-        'documentos_data': json.dumps(documentos_data),
-        'has_advogados': protocolo.advogados.exists(),
         'success': success,
         # Novos itens para suporte às abas e permissões
         'comentarios': protocolo.comentarios.select_related('usuario').order_by('-data_criacao'),
         'user_can_edit': (
-            request.user.role in [User.Role.MASTER, User.Role.ADMINISTRATIVO] or
-            protocolo.criado_por == request.user
+            request.user.role in _ROLES_GESTAO or
+            protocolo.criado_por_id == request.user.pk
         ),
-        'user_can_edit_responsavel': request.user.role in [User.Role.MASTER, User.Role.ADMINISTRATIVO],
+        'user_can_edit_responsavel': request.user.role in _ROLES_GESTAO,
     }
     return render(request, 'core/protocolo_certidao_form.html', context)
 
@@ -794,10 +1055,8 @@ def protocolo_list_em_andamento(request):
     Lista todos os protocolos com status EM_ANDAMENTO em formato de cards.
     """
     protocolos = Protocolo.objects.filter(
-        status=Protocolo.StatusProtocolo.EM_ANDAMENTO
-    ).select_related(
-        'tipo_ato', 'responsavel', 'criado_por'
-    ).prefetch_related(
+        status=_ST_EM_ANDAMENTO
+    ).with_refs().prefetch_related(
         'clientes', 'advogados'
     ).order_by('-data_criacao')
     
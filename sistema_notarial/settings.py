@@ -84,6 +84,36 @@ DATABASES = {
 }
 
 
+# Cache compartilhado entre os processos (workers) da aplicação.
+# Opções, totais, estatísticas e marcadores de alteração são invalidados
+# por sinais no processo que grava; um cache local por processo (LocMem)
+# deixaria os demais com dados antigos. Requer o pacote redis
+# (requirements.txt) e o serviço do docker-compose.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
+        'KEY_PREFIX': 'sistema_notarial',
+    }
+}
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+# Argon2 como padrão, com parâmetros ajustados em core/hashers.py
+# (requer argon2-cffi, declarado em requirements.txt via django[argon2]).
+# Os demais permanecem para verificar hashes antigos, que são convertidos
+# para Argon2 no próximo login.
+
+PASSWORD_HASHERS = [
+    'core.hashers.Argon2OWASPPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 